@@ -3,11 +3,19 @@
 import streamlit as st
 import os
 import json
-from utils import fabric_loader, gpt_designer, dalle_generator
+from utils import fabric_loader, gpt_designer, dalle_generator, design_history, session_store
 
 st.set_page_config(page_title="Fashion Upcycle AI", layout="wide")
 st.title("👗 Fashion Upcycle AI")
 
+# Each browser session gets its own workspace so concurrent designers don't overwrite
+# each other's uploads and results. Expired workspaces are cleaned up when a new one starts.
+if "session_id" not in st.session_state:
+    session_store.cleanup_expired()
+    st.session_state["session_id"] = session_store.create_session()
+session_id = st.session_state["session_id"]
+session_store.touch_session(session_id)
+
 # ──────────────────────────────────────────────────────────────
 # 🔁 1. Optional: Upload New Fabric Images
 # ──────────────────────────────────────────────────────────────
@@ -21,14 +29,29 @@ uploaded_files = st.file_uploader(
 
 if uploaded_files:
     for file in uploaded_files:
-        image_path = os.path.join("sample_inputs/images", file.name)
-        with open(image_path, "wb") as f:
-            f.write(file.getbuffer())
+        image_path = session_store.session_path(session_id, "images", file.name)
+        session_store.atomic_write(image_path, file.getbuffer())
         st.image(image_path, caption=file.name, use_column_width=True)
 
+    dedup_threshold = st.slider(
+        "Duplicate sensitivity (max differing hash bits)", 0, 20,
+        fabric_loader.dedup_index.DEFAULT_THRESHOLD
+    )
+    skip_duplicates = st.checkbox("Skip near-duplicates instead of just flagging them", value=True)
+
     if st.button("🔍 Analyze New Fabrics"):
-        results = fabric_loader.process_images_once(folder="sample_inputs/images")
+        results, duplicates, failures = fabric_loader.process_images_once(
+            folder=session_store.session_path(session_id, "images"),
+            threshold=dedup_threshold,
+            on_duplicate="skip" if skip_duplicates else "flag"
+        )
         st.success(f"✅ Processed and saved {len(results)} new fabrics.")
+        if failures:
+            st.error(f"❌ Could not analyze {len(failures)} image(s): " + ", ".join(f["image"] for f in failures))
+        if duplicates:
+            st.warning(f"♻️ Found {len(duplicates)} near-duplicate upload(s):")
+            for dup in duplicates:
+                st.markdown(f"- **{dup['image']}** looks like **{dup['match']}** (distance {dup['distance']})")
 
 # ──────────────────────────────────────────────────────────────
 # 🧵 2. Select a Fabric (Grouped Views)
@@ -39,19 +62,7 @@ st.header("2️⃣ Choose a Fabric to Upcycle")
 inventory = gpt_designer.load_fabric_inventory()
 
 # Group fabrics by base name
-def get_base_name(name):
-    suffixes = ["_detail", "_back", "_dupatta", "_bottoms", "_front", "_full"]
-    for suffix in suffixes:
-        if name.endswith(suffix):
-            return name[:-len(suffix)]
-    return name
-
-grouped_fabrics = {}
-for entry in inventory:
-    base = get_base_name(entry['name'])
-    if base not in grouped_fabrics:
-        grouped_fabrics[base] = []
-    grouped_fabrics[base].append(entry)
+grouped_fabrics = gpt_designer.group_fabrics(inventory)
 
 base_fabric_names = list(grouped_fabrics.keys())
 selected_base = st.selectbox("Select a fabric group", base_fabric_names)
@@ -94,48 +105,101 @@ uploaded_inspo = st.file_uploader(
 
 if uploaded_inspo:
     st.subheader("➕ New Inspirations You Uploaded")
+    inspo_folder = session_store.session_path(session_id, "inspiration")
     for file in uploaded_inspo:
-        path = os.path.join("sample_inputs/inspiration", file.name)
-        with open(path, "wb") as f:
-            f.write(file.getbuffer())
-        with open(path, "rb") as img:
-            encoded = img.read()
-            inspiration_images.append({"name": file.name, "base64": encoded})
+        path = os.path.join(inspo_folder, file.name)
+        session_store.atomic_write(path, file.getbuffer())
         st.image(path, caption=file.name, width=150)
+    # The session folder keeps files from earlier reruns too (including ones since removed
+    # from the uploader), so only send the images currently in the uploader
+    current_names = {file.name for file in uploaded_inspo}
+    inspiration_images.extend(
+        img for img in gpt_designer.load_inspiration_images(inspo_folder) if img["name"] in current_names
+    )
 
 # ──────────────────────────────────────────────────────────────
 # 🧠 4. Generate Designs with GPT + DALL·E
 # ──────────────────────────────────────────────────────────────
 st.header("4️⃣ Generate AI Suggestions + Mockups")
 
-if st.button("🎨 Generate Clothing Design Ideas"):
-    with st.spinner("Generating ideas with GPT-4o..."):
-        print("🧪 Sending fabric images:")
-        for img in fabric_images:
-            print(f"  - {img['name']}")
-
-        suggestions = gpt_designer.suggest_designs(
-            selected_name=selected_base,
-            inspirations=inspiration_images,
-            fabric_images=fabric_images,
-            matching_inventory=selected_inventory
+inspo_fingerprint = design_history.inspiration_fingerprint(inspiration_images)
+force_new = st.checkbox("Always generate new ideas (ignore design history)", value=False)
+
+def show_history_set(entry):
+    st.markdown(entry["suggestions"])
+    for idea in entry["ideas"]:
+        if idea["image_path"] and os.path.exists(idea["image_path"]):
+            st.image(idea["image_path"], caption=idea["dalle_prompt"], use_column_width=True)
+
+def render_missing_mockups(entry):
+    """Render (and record) mockups for ideas in a saved set that don't have one on disk yet."""
+    for idea in entry["ideas"]:
+        if idea["image_path"] and os.path.exists(idea["image_path"]):
+            continue
+        print(f"{idea['position'] + 1}. {idea['dalle_prompt']}")
+        idea["image_path"] = dalle_generator.generate_and_save_image(
+            idea["dalle_prompt"], idea["position"],
+            output_path=design_history.image_path_for(entry["id"], idea["position"])
         )
+        design_history.attach_image(entry["id"], idea["position"], idea["image_path"])
 
-        st.markdown("## ✏️ Suggested Clothing Ideas")
-        st.markdown(suggestions)
-
-        with open("last_suggestions.txt", "w") as f:
-            f.write(suggestions)
+if st.button("🎨 Generate Clothing Design Ideas"):
+    # Any saved set for this fabric + inspirations is reused, even if some mockups are
+    # missing (CLI runs, --no-render pipeline runs, a DALL·E failure midway); only those get rendered
+    entry = None if force_new else design_history.find_reusable(
+        selected_base, inspo_fingerprint, require_images=False
+    )
+
+    if entry:
+        st.info(f"♻️ Reusing saved design set #{entry['id']} for this fabric and inspiration set.")
+    else:
+        with st.spinner("Generating ideas with GPT-4o..."):
+            print("🧪 Sending fabric images:")
+            for img in fabric_images:
+                print(f"  - {img['name']}")
+
+            suggestions = gpt_designer.suggest_designs(
+                selected_name=selected_base,
+                inspirations=inspiration_images,
+                fabric_images=fabric_images,
+                matching_inventory=selected_inventory
+            )
+
+            session_store.atomic_write(session_store.session_path(session_id, "last_suggestions.txt"), suggestions)
+
+            set_id = design_history.record_suggestions(
+                selected_base, inspo_fingerprint, suggestions, selected_inventory
+            )
+            entry = design_history.get_set(set_id)
+
+    st.markdown("## ✏️ Suggested Clothing Ideas")
+    st.markdown(entry["suggestions"])
 
     with st.spinner("Generating images with DALL·E..."):
-        prompts = dalle_generator.extract_dalle_prompts(suggestions)
         print("🧵 PROMPTS BEING SENT TO DALL·E:")
-        for i, p in enumerate(prompts):
-            print(f"{i+1}. {p}")
+        render_missing_mockups(entry)
 
-        for i, prompt in enumerate(prompts):
-            dalle_generator.generate_and_save_image(prompt, i)
-            st.image(f"dalle_outputs/design_{i+1}.png", caption=prompt, use_column_width=True)
+    for idea in entry["ideas"]:
+        st.image(idea["image_path"], caption=idea["dalle_prompt"], use_column_width=True)
 
     st.success("✅ Done! Designs and mockups are shown above.")
 
+# ──────────────────────────────────────────────────────────────
+# 🗂️ 5. Browse Design History
+# ──────────────────────────────────────────────────────────────
+st.header("5️⃣ Design History")
+
+history_query = st.text_input("Search past ideas (e.g. 'halter embroidery')", key="history_query")
+only_this_fabric = st.checkbox(f"Only show ideas for '{selected_base}'", value=True)
+
+history_results = design_history.search(
+    query=history_query or None,
+    fabric_group=selected_base if only_this_fabric else None
+)
+
+if not history_results:
+    st.markdown("No saved designs yet.")
+for entry in history_results:
+    titles = ", ".join(idea["title"] for idea in entry["ideas"])
+    with st.expander(f"#{entry['id']} · {entry['fabric_group']} · {titles}"):
+        show_history_set(entry)
@@ -1,5 +1,4 @@
-import json
-import os
+from utils import session_store
 
 INPUT_FILE = "fabric_inventory.json"
 OUTPUT_FILE = "fabric_inventory_normalized.json"
@@ -25,15 +24,17 @@ def fix_typos(entry):
         entry["image_main"] = entry["image_main"].replace("detial", "detail")
 
 def normalize_inventory():
-    with open(INPUT_FILE, "r") as f:
-        inventory = json.load(f)
+    # Hold the inventory lock through the write, so concurrent normalizes are serialized and
+    # an older snapshot of the inventory can never overwrite a newer normalized file.
+    # Readers (the app, the pipeline) only ever see a complete file thanks to the atomic write.
+    with session_store.file_lock(INPUT_FILE):
+        inventory = session_store.read_json(INPUT_FILE, default=[])
 
-    for entry in inventory:
-        normalize_embellishments(entry)
-        fix_typos(entry)
+        for entry in inventory:
+            normalize_embellishments(entry)
+            fix_typos(entry)
 
-    with open(OUTPUT_FILE, "w") as f:
-        json.dump(inventory, f, indent=2)
+        session_store.atomic_write_json(OUTPUT_FILE, inventory)
 
     print(f"✅ Normalized {len(inventory)} items and saved to {OUTPUT_FILE}")
 
@@ -0,0 +1,314 @@
+# pipeline.py
+#
+# Headless runner for the whole flow:
+#   ingest (new fabric photos -> inventory) -> normalize -> suggest (GPT-4o) -> render (DALL·E)
+#
+# Suggest and render run as worker threads connected by bounded queues, so mockups for one
+# fabric group are rendered while GPT-4o is already working on the next group.
+# Ingest and normalize run on every invocation (ingest is driven by what's in the images
+# folder, and duplicates are caught anyway). Per-group suggest/render progress is
+# checkpointed so an interrupted or failed run can be resumed; the checkpoint is deleted
+# once a run finishes cleanly, so the next run starts fresh.
+#
+# Usage:
+#   python pipeline.py                          # every fabric group in the inventory
+#   python pipeline.py yellow_kurti pink_saree  # only these groups
+#   python pipeline.py --reset                  # ignore the previous checkpoint
+#
+# Exits with status 1 if any stage recorded a failure.
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import traceback
+
+import normalize_fabrics
+from utils import fabric_loader, gpt_designer, dalle_generator, design_history, session_store
+
+CHECKPOINT_FILE = "pipeline_checkpoint.json"
+
+# Marks the end of a queue for one worker
+_DONE = None
+
+class Checkpoint:
+    """
+    Small JSON record of per-group progress, shared by all worker threads.
+    Layout: {"scope": {"groups": [...] or "all", "inspiration_fingerprint": "..."},
+             "groups": {"yellow_kurti": {"set_id": 3, "rendered": true}}}
+
+    A saved checkpoint is only resumed when its scope (requested groups + inspiration
+    images) matches the current run; anything else starts over.
+    """
+
+    def __init__(self, scope, path=CHECKPOINT_FILE, reset=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {"scope": scope, "groups": {}}
+
+        saved = None if reset else session_store.read_json(path)
+        if saved and saved.get("scope") == scope:
+            self.state = saved
+            self.state.setdefault("groups", {})
+            print(f"📌 Resuming unfinished run from checkpoint {path}")
+        elif saved:
+            print(f"📌 Checkpoint {path} is for a different run (groups or inspirations changed) - starting fresh")
+
+    def group(self, name):
+        with self.lock:
+            return dict(self.state["groups"].get(name, {}))
+
+    def mark_group(self, name, **fields):
+        with self.lock:
+            self.state["groups"].setdefault(name, {}).update(fields)
+            self._save()
+
+    def clear(self):
+        """Forget the run once it has finished cleanly."""
+        with self.lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _save(self):
+        # Temp file + rename so a crash never leaves a half-written checkpoint
+        session_store.atomic_write_json(self.path, self.state)
+
+class StageStats:
+    """Per-stage counters for the throughput report."""
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.items = 0
+        self.skipped = 0
+        self.failed = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+
+    def record(self, seconds, outcome="ok"):
+        with self.lock:
+            if outcome == "ok":
+                self.items += 1
+            elif outcome == "skipped":
+                self.skipped += 1
+            else:
+                self.failed += 1
+            self.busy += seconds
+
+    def record_batch(self, count, seconds, skipped=0, failed=0):
+        with self.lock:
+            self.items += count
+            self.skipped += skipped
+            self.failed += failed
+            self.busy += seconds
+
+    def start(self):
+        with self.lock:
+            if self.started is None:
+                self.started = time.time()
+
+    def finish(self):
+        with self.lock:
+            self.finished = time.time()
+
+    def report(self):
+        wall = (self.finished or time.time()) - self.started if self.started else 0.0
+        rate = self.items / wall if wall > 0 else 0.0
+        return (f"{self.name:<10} {self.items:>4} done  {self.skipped:>4} skipped  {self.failed:>4} failed  "
+                f"busy {self.busy:7.1f}s  wall {wall:7.1f}s  {rate:6.3f} items/s")
+
+def run_ingest(images_folder, stats):
+    stats.start()
+    began = time.time()
+    results, duplicates, failures = fabric_loader.process_images_once(folder=images_folder)
+    # Flagged duplicates are still analyzed and saved, so they're already in results;
+    # only the ones moved aside without a GPT call count as skipped
+    skipped = sum(1 for dup in duplicates if "moved_to" in dup)
+    stats.record_batch(len(results), time.time() - began, skipped=skipped, failed=len(failures))
+    stats.finish()
+
+def run_normalize(stats):
+    # Cheap local rewrite of the inventory, so always redo it to pick up new entries
+    stats.start()
+    began = time.time()
+    normalize_fabrics.normalize_inventory()
+    stats.record(time.time() - began)
+    stats.finish()
+
+def suggest_worker(in_q, out_q, inspirations, inspo_fingerprint, grouped, checkpoint, stats, reuse):
+    while True:
+        name = in_q.get()
+        if name is _DONE:
+            break
+        stats.start()
+        began = time.time()
+        try:
+            set_id = checkpoint.group(name).get("set_id")
+            if set_id is not None:
+                stats.record(0, "skipped")
+            else:
+                reusable = design_history.find_reusable(name, inspo_fingerprint, require_images=False) if reuse else None
+                if reusable:
+                    set_id = reusable["id"]
+                    print(f"♻️ [{name}] reusing design set #{set_id}")
+                    stats.record(time.time() - began, "skipped")
+                else:
+                    fabric_images = gpt_designer.load_fabric_images(name, entries=grouped[name])
+                    if not fabric_images:
+                        print(f"❌ [{name}] no fabric images found - skipping")
+                        stats.record(time.time() - began, "failed")
+                        continue
+                    print(f"🧠 [{name}] asking GPT-4o for ideas...")
+                    suggestions = gpt_designer.suggest_designs(name, inspirations, fabric_images, grouped[name])
+                    set_id = design_history.record_suggestions(name, inspo_fingerprint, suggestions, grouped[name])
+                    stats.record(time.time() - began)
+                checkpoint.mark_group(name, set_id=set_id)
+            if out_q is not None:
+                out_q.put((name, set_id))
+        except Exception as e:
+            print(f"💥 [{name}] suggest failed: {e}")
+            traceback.print_exc()
+            stats.record(time.time() - began, "failed")
+
+def render_worker(in_q, checkpoint, stats):
+    while True:
+        item = in_q.get()
+        if item is _DONE:
+            break
+        name, set_id = item
+        stats.start()
+        began = time.time()
+        try:
+            if checkpoint.group(name).get("rendered"):
+                stats.record(0, "skipped")
+                continue
+            entry = design_history.get_set(set_id)
+            if entry is None:
+                print(f"❌ [{name}] design set #{set_id} not found in design history - not rendered")
+                stats.record(time.time() - began, "failed")
+                continue
+            ideas = entry["ideas"]
+            for idea in ideas:
+                # Ideas rendered before an interruption keep their image
+                if idea["image_path"] and os.path.exists(idea["image_path"]):
+                    continue
+                path = dalle_generator.generate_and_save_image(
+                    idea["dalle_prompt"], idea["position"],
+                    output_path=design_history.image_path_for(set_id, idea["position"])
+                )
+                design_history.attach_image(set_id, idea["position"], path)
+            checkpoint.mark_group(name, rendered=True)
+            print(f"🖼️ [{name}] rendered {len(ideas)} mockups for set #{set_id}")
+            stats.record(time.time() - began)
+        except Exception as e:
+            print(f"💥 [{name}] render failed: {e}")
+            traceback.print_exc()
+            stats.record(time.time() - began, "failed")
+
+def run_pipeline(groups=None, images_folder="sample_inputs/images", inspiration_folder="sample_inputs/inspiration",
+                 checkpoint_file=CHECKPOINT_FILE, reset=False, skip_ingest=False, render=True, reuse=True,
+                 suggest_workers=1, render_workers=1, queue_size=2):
+    stats = {name: StageStats(name) for name in ("ingest", "normalize", "suggest", "render")}
+    started = time.time()
+
+    inspirations = gpt_designer.load_inspiration_images(inspiration_folder)
+    inspo_fingerprint = design_history.inspiration_fingerprint(inspirations)
+
+    scope = {"groups": sorted(groups) if groups else "all", "inspiration_fingerprint": inspo_fingerprint}
+    checkpoint = Checkpoint(scope, checkpoint_file, reset=reset)
+
+    if not skip_ingest:
+        run_ingest(images_folder, stats["ingest"])
+    run_normalize(stats["normalize"])
+
+    grouped = gpt_designer.group_fabrics(gpt_designer.load_fabric_inventory())
+    names = list(grouped.keys())
+    if groups:
+        missing = [g for g in groups if g not in grouped]
+        for g in missing:
+            print(f"❌ Fabric group '{g}' not in inventory - skipping")
+            stats["suggest"].record(0, "failed")
+        names = [g for g in groups if g in grouped]
+
+    print(f"🧵 Running {len(names)} fabric group(s): {', '.join(names)}")
+
+    # Bounded queues: the feeder can only get queue_size groups ahead of the suggesters,
+    # and suggesters block once queue_size finished groups are waiting to be rendered.
+    suggest_q = queue.Queue(maxsize=queue_size)
+    render_q = queue.Queue(maxsize=queue_size)
+
+    suggesters = [
+        threading.Thread(target=suggest_worker, name=f"suggest-{i}",
+                         args=(suggest_q, render_q if render else None, inspirations, inspo_fingerprint, grouped, checkpoint, stats["suggest"], reuse))
+        for i in range(suggest_workers)
+    ]
+    renderers = [
+        threading.Thread(target=render_worker, name=f"render-{i}", args=(render_q, checkpoint, stats["render"]))
+        for i in range(render_workers if render else 0)
+    ]
+    for t in suggesters + renderers:
+        t.start()
+
+    for name in names:
+        suggest_q.put(name)
+    for _ in suggesters:
+        suggest_q.put(_DONE)
+    for t in suggesters:
+        t.join()
+    stats["suggest"].finish()
+
+    if render:
+        for _ in renderers:
+            render_q.put(_DONE)
+        for t in renderers:
+            t.join()
+        stats["render"].finish()
+
+    total = time.time() - started
+    print("\n📊 Stage throughput")
+    for stage in stats.values():
+        print(f"   {stage.report()}")
+    print(f"   total wall time {total:.1f}s")
+
+    failed = sum(stage.failed for stage in stats.values())
+    if failed:
+        print(f"⚠️ {failed} item(s) failed - checkpoint kept at {checkpoint_file}, rerun to retry them")
+    else:
+        checkpoint.clear()
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run ingest → normalize → suggest → render without the UI.")
+    parser.add_argument("groups", nargs="*", help="fabric groups to process (default: all in the inventory)")
+    parser.add_argument("--images", default="sample_inputs/images", help="folder with new fabric photos to ingest")
+    parser.add_argument("--inspiration", default="sample_inputs/inspiration")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--reset", action="store_true", help="start over instead of resuming")
+    parser.add_argument("--skip-ingest", action="store_true")
+    parser.add_argument("--no-render", action="store_true", help="stop after GPT-4o suggestions")
+    parser.add_argument("--no-reuse", action="store_true", help="always call GPT-4o even if design history has a match")
+    parser.add_argument("--suggest-workers", type=int, default=1)
+    parser.add_argument("--render-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    stats = run_pipeline(
+        groups=args.groups,
+        images_folder=args.images,
+        inspiration_folder=args.inspiration,
+        checkpoint_file=args.checkpoint,
+        reset=args.reset,
+        skip_ingest=args.skip_ingest,
+        render=not args.no_render,
+        reuse=not args.no_reuse,
+        suggest_workers=max(1, args.suggest_workers),
+        render_workers=max(1, args.render_workers),
+        queue_size=max(1, args.queue_size)
+    )
+    return 1 if any(stage.failed for stage in stats.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
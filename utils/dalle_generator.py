@@ -4,6 +4,12 @@ import base64
 from openai import OpenAI
 from dotenv import load_dotenv
 import requests
+# Run as `python utils/dalle_generator.py` the repo root isn't on sys.path, so add it
+# before importing from the utils package
+if not __package__:
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import session_store, design_history
 
 load_dotenv()
 client = OpenAI()
@@ -13,22 +19,16 @@ os.makedirs("dalle_outputs", exist_ok=True)
 
 def extract_dalle_prompts(text):
     """
-    Extract DALL·E prompts from GPT output that may be written across multiple lines.
-    Looks for lines that start with 'DALL·E Prompt:' or similar, then grabs the next line.
+    Extract DALL·E prompts from GPT output, in idea order.
+    Uses design_history.parse_ideas so prompts written on the label line
+    ('DALL·E Prompt: ...') or on the line after it are both picked up, and
+    prompt i always lines up with idea position i in the design history.
     """
-    lines = text.splitlines()
-    prompts = []
-    for i, line in enumerate(lines):
-        if "dall" in line.lower() and "prompt" in line.lower():
-            # Grab the next non-empty line
-            for j in range(i + 1, len(lines)):
-                if lines[j].strip():
-                    prompts.append(lines[j].strip())
-                    break
-    return prompts
+    return [idea["dalle_prompt"] for idea in design_history.parse_ideas(text)]
 
 # Uses OpenAI's image generation to create and save an image based on a prompt.
-def generate_and_save_image(prompt, index):
+# Saves to dalle_outputs/design_{index+1}.png unless output_path is given; returns the path.
+def generate_and_save_image(prompt, index, output_path=None):
      print(f"🎨 Generating image for: '{prompt}'")
 
      print(f"🎨 Sending to DALL·E: {prompt}")
@@ -44,14 +44,14 @@ def generate_and_save_image(prompt, index):
      image_url = response.data[0].url
 
     # Save URL as .txt and also download image
-     image_filename = f"dalle_outputs/design_{index+1}.png"
+     image_filename = output_path or f"dalle_outputs/design_{index+1}.png"
 
     # Download the image from the URL
      img_data = requests.get(image_url).content
-     with open(image_filename, 'wb') as handler:
-        handler.write(img_data)
+     session_store.atomic_write(image_filename, img_data)
 
      print(f"✅ Saved image to: {image_filename}")
+     return image_filename
 
 def main():
     # Step 1: Load the last GPT output (can modify to read from your pipeline later)
@@ -0,0 +1,165 @@
+import os
+from PIL import Image, ImageOps
+from utils import session_store
+
+# Default folder holding images that have already been analyzed and added to the inventory
+PROCESSED_FOLDER = "sample_inputs/processed_images"
+
+# Max Hamming distance (out of 64 bits) for two images to count as near-duplicates.
+# On the sample photos a re-exported or resized copy is at 0 and crops of up to ~6% are
+# at 8 or less, while the closest pair of different garments/inspirations is at 18.
+# Crops of 10% or more land above 10 and are not treated as duplicates.
+DEFAULT_THRESHOLD = 10
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Sidecar file (inside the indexed folder) caching each image's hash
+HASH_CACHE_FILE = ".dhash_cache.json"
+
+def dhash(image_path, hash_size=8):
+    """
+    Compute a difference hash (dHash) for an image.
+    Shrinks the image to grayscale (hash_size+1) x hash_size and records whether each
+    pixel is brighter than its right neighbour, giving a hash_size*hash_size bit integer.
+    Re-encodes, resizes and small crops (a few percent) only flip a few bits.
+    """
+    with Image.open(image_path) as img:
+        # Phone photos are stored sideways with an EXIF orientation tag; hash the upright view
+        img = ImageOps.exif_transpose(img)
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+class BKTree:
+    """
+    Burkhard-Keller tree over perceptual hashes.
+    Each child edge is labelled with its Hamming distance to the parent, so a lookup
+    only descends into children whose label is within `threshold` of the query's
+    distance to the parent (triangle inequality) instead of scanning every hash.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, hash_value, name):
+        node = {"hash": hash_value, "name": name, "children": {}}
+        self.size += 1
+
+        if self.root is None:
+            self.root = node
+            return
+
+        current = self.root
+        while True:
+            distance = hamming_distance(hash_value, current["hash"])
+            child = current["children"].get(distance)
+            if child is None:
+                current["children"][distance] = node
+                return
+            current = child
+
+    def search(self, hash_value, threshold=DEFAULT_THRESHOLD):
+        """Return a list of (distance, name) within threshold, closest first."""
+        matches = []
+        if self.root is None:
+            return matches
+
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(hash_value, node["hash"])
+            if distance <= threshold:
+                matches.append((distance, node["name"]))
+
+            for edge, child in node["children"].items():
+                if distance - threshold <= edge <= distance + threshold:
+                    stack.append(child)
+
+        matches.sort()
+        return matches
+
+    def __len__(self):
+        return self.size
+
+def _cache_path(folder):
+    return os.path.join(folder, HASH_CACHE_FILE)
+
+def _file_key(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def build_index(folder=PROCESSED_FOLDER):
+    """
+    Load every image in the folder into a BK-tree.
+    Hashes are cached in a sidecar file keyed by filename, mtime and size, so only new
+    or changed images get decoded; the rest of the build is a directory listing.
+    """
+    tree = BKTree()
+    if not os.path.exists(folder):
+        print(f"📂 Folder '{folder}' not found. Starting with an empty dedup index.")
+        return tree
+
+    cache_path = _cache_path(folder)
+    with session_store.file_lock(cache_path):
+        cache = session_store.read_json(cache_path, default={})
+        fresh = {}
+        hashed = 0
+
+        for filename in sorted(os.listdir(folder)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(folder, filename)
+            try:
+                key = _file_key(path)
+                cached = cache.get(filename)
+                if cached and cached["key"] == key:
+                    hash_value = int(cached["hash"], 16)
+                else:
+                    hash_value = dhash(path)
+                    hashed += 1
+                fresh[filename] = {"key": key, "hash": f"{hash_value:016x}"}
+                tree.add(hash_value, filename)
+            except Exception as e:
+                print(f"⚠️ Could not hash {filename}: {e}")
+
+        # Rewrite only when something was added, changed or removed
+        if fresh != cache:
+            session_store.atomic_write_json(cache_path, fresh)
+
+    print(f"🧬 Dedup index built with {len(tree)} images from {folder} ({hashed} newly hashed)")
+    return tree
+
+def remember_hash(path, hash_value):
+    """Record the hash of a file just added to the processed folder so it is never re-decoded."""
+    cache_path = _cache_path(os.path.dirname(path) or ".")
+    with session_store.locked_json(cache_path, default={}) as cache:
+        cache[os.path.basename(path)] = {"key": _file_key(path), "hash": f"{hash_value:016x}"}
+
+def find_duplicate(tree, image_path, threshold=DEFAULT_THRESHOLD):
+    """
+    Look up an image in the index.
+    Returns (hash, match) where match is {"image", "match", "distance"} for the closest
+    near-duplicate, or None if nothing is within threshold.
+    """
+    hash_value = dhash(image_path)
+    matches = tree.search(hash_value, threshold)
+    if not matches:
+        return hash_value, None
+
+    distance, name = matches[0]
+    return hash_value, {
+        "image": os.path.basename(image_path),
+        "match": name,
+        "distance": distance
+    }
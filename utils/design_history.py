@@ -0,0 +1,306 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+from contextlib import closing
+
+DB_PATH = "design_history.db"
+HISTORY_IMAGE_FOLDER = "dalle_outputs/history"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suggestion_sets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    fabric_group TEXT NOT NULL,
+    inspiration_fingerprint TEXT NOT NULL,
+    materials TEXT NOT NULL DEFAULT '',
+    colors TEXT NOT NULL DEFAULT '',
+    suggestions TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sets_lookup
+    ON suggestion_sets (fabric_group, inspiration_fingerprint, created_at);
+
+CREATE TABLE IF NOT EXISTS ideas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    set_id INTEGER NOT NULL REFERENCES suggestion_sets(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    dalle_prompt TEXT NOT NULL,
+    image_path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_ideas_set ON ideas (set_id, position);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS ideas_fts USING fts5 (
+    title, description, dalle_prompt, fabric_group,
+    tokenize='porter unicode61'
+);
+"""
+
+def connect(db_path=DB_PATH):
+    # WAL lets many sessions read while one writes; writers wait instead of failing
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+def inspiration_fingerprint(inspirations):
+    """
+    Stable hash of a set of inspiration images (the dicts from load_inspiration_images).
+    Order and file names don't matter, only the image contents.
+    """
+    digests = sorted(hashlib.sha256(img["base64"].encode("utf-8") if isinstance(img["base64"], str) else img["base64"]).hexdigest()
+                     for img in inspirations)
+    return hashlib.sha256("".join(digests).encode("utf-8")).hexdigest()[:16]
+
+# "### 1. Halter Top", "1) Halter Top", "**Halter Top**", "Idea 2: Peplum Blouse"
+_HEADING = re.compile(r"^\s*(#{1,6}\s|\d+[.)]\s|\*\*[^*]+\*\*:?\s*$|idea\s*\d+\b)", re.IGNORECASE)
+
+def _is_prompt_label(line):
+    lowered = line.lower()
+    return "dall" in lowered and "prompt" in lowered
+
+def _clean_prompt(text):
+    # Drop the markdown/brackets/quotes GPT tends to wrap prompts in
+    text = text.strip().strip("*").strip()
+    if text.startswith("[") and text.endswith("]"):
+        text = text[1:-1].strip()
+    return text.strip("\"'“”‘’`").strip()
+
+def _clean_title(line):
+    return re.sub(r"^[#*\s]*(?:idea\s*\d+\s*[:.)-]?|\d+[.)])?\s*|[*\s:]+$", "", line, flags=re.IGNORECASE).strip("* ")
+
+def parse_ideas(suggestions):
+    """
+    Split a GPT suggestion text into ideas.
+    Each idea ends with a 'DALL·E Prompt:' label; the prompt is the text after 'Prompt:'
+    on the same line, or else the next non-empty line. The title is the last heading-like
+    line before the idea's description, so a preamble such as "Here are three ideas:"
+    is skipped.
+
+    >>> text = "Ideas:\\n### 1. Halter\\n**DALL·E Prompt**: 'a halter top'\\n### 2. Skirt\\n**DALL·E-style Prompt**: \\"a skirt\\""
+    >>> [(i["title"], i["dalle_prompt"]) for i in parse_ideas(text)]
+    [('Halter', 'a halter top'), ('Skirt', 'a skirt')]
+    """
+    lines = suggestions.splitlines()
+    ideas = []
+    chunk = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if not _is_prompt_label(line):
+            if line.strip():
+                chunk.append(line)
+            i += 1
+            continue
+
+        # Prompt on the label line itself ("DALL·E Prompt: [...]"), else on the next line
+        # \W* lets markdown sit between the word and the colon ("**DALL·E Prompt**:")
+        same_line = re.split(r"prompt\W*:", line, maxsplit=1, flags=re.IGNORECASE)
+        prompt = _clean_prompt(same_line[1]) if len(same_line) > 1 else ""
+        if not prompt:
+            for j in range(i + 1, len(lines)):
+                if lines[j].strip():
+                    prompt = _clean_prompt(lines[j])
+                    i = j
+                    break
+        i += 1
+        if not prompt:
+            continue
+
+        # Title = last heading in the leading run of the chunk; description = everything after it
+        title_index = None
+        for k, text in enumerate(chunk):
+            if _HEADING.match(text):
+                title_index = k
+            elif title_index is not None:
+                break
+        if title_index is None:
+            title_index = 0 if chunk else None
+
+        title = _clean_title(chunk[title_index]) if title_index is not None else ""
+        description = chunk[title_index + 1:] if title_index is not None else []
+        ideas.append({
+            "title": title or f"Idea {len(ideas) + 1}",
+            "description": "\n".join(description).strip(),
+            "dalle_prompt": prompt
+        })
+        chunk = []
+    return ideas
+
+def record_suggestions(fabric_group, inspiration_fp, suggestions, matching_inventory=(), db_path=DB_PATH):
+    """Store a suggestion set and its parsed ideas. Returns the new set id."""
+    materials = sorted({str(item.get("material", "")).lower() for item in matching_inventory if item.get("material")})
+    colors = sorted({str(c).lower() for item in matching_inventory for c in item.get("colors", [])})
+    ideas = parse_ideas(suggestions)
+
+    with closing(connect(db_path)) as conn, conn:
+        cur = conn.execute(
+            "INSERT INTO suggestion_sets (created_at, fabric_group, inspiration_fingerprint, materials, colors, suggestions) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (time.time(), fabric_group, inspiration_fp, ",".join(materials), ",".join(colors), suggestions)
+        )
+        set_id = cur.lastrowid
+        for position, idea in enumerate(ideas):
+            cur = conn.execute(
+                "INSERT INTO ideas (set_id, position, title, description, dalle_prompt) VALUES (?, ?, ?, ?, ?)",
+                (set_id, position, idea["title"], idea["description"], idea["dalle_prompt"])
+            )
+            conn.execute(
+                "INSERT INTO ideas_fts (rowid, title, description, dalle_prompt, fabric_group) VALUES (?, ?, ?, ?, ?)",
+                (cur.lastrowid, idea["title"], idea["description"], idea["dalle_prompt"], fabric_group)
+            )
+
+    print(f"🗂️ Saved suggestion set #{set_id} ({len(ideas)} ideas) for {fabric_group}")
+    return set_id
+
+def image_path_for(set_id, position):
+    """Where the mockup for an idea should be rendered so it survives later runs."""
+    return os.path.join(HISTORY_IMAGE_FOLDER, f"set_{set_id:05d}_design_{position + 1}.png")
+
+def attach_image(set_id, position, image_path, db_path=DB_PATH):
+    with closing(connect(db_path)) as conn, conn:
+        conn.execute(
+            "UPDATE ideas SET image_path = ? WHERE set_id = ? AND position = ?",
+            (image_path, set_id, position)
+        )
+
+def _fts_query(text):
+    # Quote every token so user input can't break FTS5 query syntax
+    tokens = re.findall(r"\w+", text)
+    return " ".join('"' + t.replace('"', '""') + '"' for t in tokens)
+
+def _attribute_filters(fabric_group=None, inspiration_fp=None, material=None, color=None):
+    clauses, params = [], []
+    if fabric_group:
+        clauses.append("s.fabric_group = ?")
+        params.append(fabric_group)
+    if inspiration_fp:
+        clauses.append("s.inspiration_fingerprint = ?")
+        params.append(inspiration_fp)
+    if material:
+        clauses.append("(',' || s.materials || ',') LIKE ?")
+        params.append(f"%,{material.lower()},%")
+    if color:
+        clauses.append("(',' || s.colors || ',') LIKE ?")
+        params.append(f"%,{color.lower()},%")
+    return clauses, params
+
+def _load_sets(conn, set_ids):
+    sets = []
+    for set_id in set_ids:
+        row = conn.execute("SELECT * FROM suggestion_sets WHERE id = ?", (set_id,)).fetchone()
+        if row is None:
+            continue
+        ideas = conn.execute(
+            "SELECT position, title, description, dalle_prompt, image_path FROM ideas WHERE set_id = ? ORDER BY position",
+            (set_id,)
+        ).fetchall()
+        entry = dict(row)
+        entry["ideas"] = [dict(i) for i in ideas]
+        sets.append(entry)
+    return sets
+
+def search(query=None, fabric_group=None, inspiration_fp=None, material=None, color=None, limit=5, db_path=DB_PATH):
+    """
+    Search past suggestion sets.
+    `query` is matched against idea titles, descriptions, DALL·E prompts and fabric group
+    through the FTS5 index (best match first); the other arguments are exact attribute
+    filters. Without a query the newest matching sets are returned.
+    """
+    clauses, params = _attribute_filters(fabric_group, inspiration_fp, material, color)
+
+    with closing(connect(db_path)) as conn:
+        fts = _fts_query(query) if query else ""
+        if fts:
+            sql = (
+                "SELECT i.set_id, MIN(hits.score) AS score FROM "
+                "(SELECT rowid, rank AS score FROM ideas_fts WHERE ideas_fts MATCH ?) hits "
+                "JOIN ideas i ON i.id = hits.rowid "
+                "JOIN suggestion_sets s ON s.id = i.set_id" +
+                (" WHERE " + " AND ".join(clauses) if clauses else "") +
+                " GROUP BY i.set_id ORDER BY score, MAX(s.created_at) DESC LIMIT ?"
+            )
+            rows = conn.execute(sql, [fts] + params + [limit]).fetchall()
+        else:
+            sql = (
+                "SELECT s.id AS set_id FROM suggestion_sets s" +
+                (" WHERE " + " AND ".join(clauses) if clauses else "") +
+                " ORDER BY s.created_at DESC LIMIT ?"
+            )
+            rows = conn.execute(sql, params + [limit]).fetchall()
+
+        return _load_sets(conn, [r["set_id"] for r in rows])
+
+def get_set(set_id, db_path=DB_PATH):
+    """Load one suggestion set with its ideas, or None if it doesn't exist."""
+    with closing(connect(db_path)) as conn:
+        sets = _load_sets(conn, [set_id])
+    return sets[0] if sets else None
+
+def find_reusable(fabric_group, inspiration_fp, require_images=True, db_path=DB_PATH):
+    """
+    Most recent suggestion set for the same fabric group and inspiration images.
+    With require_images, only sets whose mockups are all still on disk count as a match.
+    Returns None when nothing can be reused, so the caller should generate.
+    """
+    for entry in search(fabric_group=fabric_group, inspiration_fp=inspiration_fp, limit=20, db_path=db_path):
+        if not entry["ideas"]:
+            continue
+        if require_images and not all(i["image_path"] and os.path.exists(i["image_path"]) for i in entry["ideas"]):
+            continue
+        return entry
+    return None
+
+def print_set(entry):
+    created = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["created_at"]))
+    print(f"\n🗂️ Set #{entry['id']} — {entry['fabric_group']} ({created})")
+    for idea in entry["ideas"]:
+        print(f"  {idea['position'] + 1}. {idea['title']}")
+        print(f"     DALL·E Prompt: {idea['dalle_prompt']}")
+        if idea["image_path"]:
+            print(f"     🖼️ {idea['image_path']}")
+
+def main(argv=None):
+    """
+    Usage:
+      python -m utils.design_history [search words] [--fabric NAME] [--material M] [--color C] [--limit N] [--json]
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Search past design suggestions.")
+    parser.add_argument("query", nargs="*", help="full-text search words")
+    parser.add_argument("--fabric", help="fabric group, e.g. yellow_kurti")
+    parser.add_argument("--material")
+    parser.add_argument("--color")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print raw JSON")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args(argv)
+
+    results = search(
+        query=" ".join(args.query) or None,
+        fabric_group=args.fabric,
+        material=args.material,
+        color=args.color,
+        limit=args.limit,
+        db_path=args.db
+    )
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+
+    if not results:
+        print("📭 No matching designs in history.")
+        return
+    for entry in results:
+        print_set(entry)
+
+if __name__ == "__main__":
+    main()
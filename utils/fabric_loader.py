@@ -23,9 +23,24 @@ from openai import OpenAI
 # Helps for moving files
 import shutil
 
+import uuid
+
+# Run as `python utils/fabric_loader.py` the repo root isn't on sys.path, so add it
+# before importing from the utils package
+if not __package__:
+    import sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Perceptual-hash index used to catch re-uploads before paying for a GPT call
+from utils import dedup_index
+
+# Locking + atomic writes for the shared inventory file
+from utils import session_store
+
 WATCH_FOLDER = "sample_inputs/images/"
 OUTPUT_JSON = "fabric_inventory.json"
 PROCESSED_FOLDER = "sample_inpits/processed_images/"
+DUPLICATES_FOLDER = "sample_inputs/duplicate_images/"
 
 client = OpenAI()
 
@@ -192,73 +207,134 @@ def save_fabric_entry(fabric_data, image_path, output_file="fabric_inventory.jso
         print(f"⚠️ No fabric data to save for {image_path}")
         return
         
-    # Load existing inventory
-    if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
-        with open(output_file, "r") as f:
-            inventory = json.load(f)
-    else:
-        inventory = []
-    
-    # Generate a new unique ID
-    fabric_id = f"fabric_{len(inventory) + 1:03d}"
-
     # Determine the fabric name from image file
     filename = os.path.basename(image_path)
     fabric_name = filename.lower().replace(".jpg", "").replace(".jpeg", "").replace(".png", "")
 
-    # Build full record
-    fabric_entry = {
-        "id": fabric_id,
-        "name": fabric_name,
-        "image_main": image_path, 
-        **fabric_data,
-        "is_wearable_as_is": "",
-        "size_issue": "",
-        "upcycle_only": True,
-        "notes": ""
-    }
-
-    # Append to JSON
-    inventory.append(fabric_entry)
-    with open(output_file, "w") as f:
-        json.dump(inventory, f, indent=2)
-
-    # Move the image to processed_images/
-    os.makedirs("sample_inputs/processed_images", exist_ok=True)
-    new_path = os.path.join("sample_inputs/processed_images", filename)
-    shutil.move(image_path, new_path)
+    # Several sessions can ingest at once, so the ID is assigned and the record appended
+    # while holding the inventory lock, and the file is replaced atomically
+    with session_store.locked_json(output_file, default=[]) as inventory:
+        # Generate a new unique ID
+        fabric_id = f"fabric_{len(inventory) + 1:03d}"
+
+        # Move the image to processed_images/ without clobbering another upload of the same name
+        os.makedirs("sample_inputs/processed_images", exist_ok=True)
+        new_path = os.path.join("sample_inputs/processed_images", filename)
+        if os.path.exists(new_path):
+            new_path = os.path.join("sample_inputs/processed_images", f"{fabric_id}_{filename}")
+        shutil.move(image_path, new_path)
+
+        # Build full record (points at the processed copy, since session uploads get cleaned up)
+        fabric_entry = {
+            "id": fabric_id,
+            "name": fabric_name,
+            "image_main": new_path,
+            **fabric_data,
+            "is_wearable_as_is": "",
+            "size_issue": "",
+            "upcycle_only": True,
+            "notes": ""
+        }
+
+        # Append to JSON
+        inventory.append(fabric_entry)
 
     print(f"✅ Saved {fabric_id} and moved image to sample_inputs/processed_images/")
+    return fabric_entry
+
+def process_images_once(folder="sample_inputs/images", threshold=dedup_index.DEFAULT_THRESHOLD, on_duplicate="skip", index=None):
+    """
+    Run a single ingest pass over the folder.
+    Every image is checked against the perceptual-hash index first; near-duplicates
+    (within `threshold` bits) are reported and, with on_duplicate="skip", moved to
+    DUPLICATES_FOLDER without calling GPT-4o. With on_duplicate="flag" they are still
+    analyzed but the entry records which image it duplicates.
+    Images whose metadata could not be generated or saved stay in the folder for the next pass.
+    Returns (saved_entries, duplicates_report, failures), where each failure is {"image", "error"}.
+    """
+    if on_duplicate not in ("skip", "flag"):
+        raise ValueError(f"on_duplicate must be 'skip' or 'flag', got {on_duplicate!r}")
+
+    results = []
+    duplicates = []
+    failures = []
+
+    if not os.path.exists(folder):
+        print(f"⚠️ Images folder '{folder}' doesn't exist. Creating it...")
+        os.makedirs(folder)
+        return results, duplicates, failures
+
+    if index is None:
+        index = dedup_index.build_index()
+
+    image_files = [f for f in sorted(os.listdir(folder)) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+
+    for filename in image_files:
+        image_path = os.path.join(folder, filename)
+        print(f"🔄 Processing {filename}...")
+
+        try:
+            hash_value, duplicate = dedup_index.find_duplicate(index, image_path, threshold)
+        except Exception as e:
+            print(f"⚠️ Could not hash {filename}, skipping dedup check: {e}")
+            hash_value, duplicate = None, None
+
+        if duplicate:
+            duplicates.append(duplicate)
+            print(f"♻️ {filename} looks like {duplicate['match']} (distance {duplicate['distance']})")
+            if on_duplicate == "skip":
+                # Unique prefix so same-named uploads (from any session) never overwrite each other
+                os.makedirs(DUPLICATES_FOLDER, exist_ok=True)
+                moved_to = os.path.join(DUPLICATES_FOLDER, f"{uuid.uuid4().hex[:8]}_{filename}")
+                shutil.move(image_path, moved_to)
+                duplicate["moved_to"] = moved_to
+                continue
+
+        try:
+            fabric_data = generate_fabric_metadata(image_path)
+            if fabric_data:
+                if duplicate:
+                    fabric_data["duplicate_of"] = duplicate["match"]
+                entry = save_fabric_entry(fabric_data, image_path)
+                results.append(entry)
+                # Index it right away so later copies in the same batch are caught too
+                if hash_value is not None:
+                    index.add(hash_value, os.path.basename(entry["image_main"]))
+                    dedup_index.remember_hash(entry["image_main"], hash_value)
+            else:
+                print(f"⚠️ Could not process {filename} - skipping")
+                failures.append({"image": filename, "error": "no metadata returned"})
+        except Exception as e:
+            print(f"💥 Error processing {filename}: {e}")
+            import traceback
+            traceback.print_exc()
+            failures.append({"image": filename, "error": str(e)})
+
+    if duplicates:
+        print(f"♻️ Found {len(duplicates)} near-duplicate(s):")
+        for dup in duplicates:
+            print(f"   - {dup['image']} ~ {dup['match']} (distance {dup['distance']})")
+
+    return results, duplicates, failures
 
 def main():
+    index = dedup_index.build_index()
     while True:
         image_folder = "images"
-        if not os.path.exists(image_folder):
-            print(f"⚠️ Images folder '{image_folder}' doesn't exist. Creating it...")
-            os.makedirs(image_folder)
-            
-        image_files = [f for f in os.listdir(image_folder) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
-        
+        image_files = []
+        if os.path.exists(image_folder):
+            image_files = [f for f in os.listdir(image_folder) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
+
         if not image_files:
+            if not os.path.exists(image_folder):
+                print(f"⚠️ Images folder '{image_folder}' doesn't exist. Creating it...")
+                os.makedirs(image_folder)
             print("📭 No images found. Waiting...")
             time.sleep(5)
             continue
 
-        for filename in image_files:
-            image_path = os.path.join(image_folder, filename)
-            print(f"🔄 Processing {filename}...")
-
-            try:
-                fabric_data = generate_fabric_metadata(image_path)
-                if fabric_data:
-                    save_fabric_entry(fabric_data, image_path)
-                else:
-                    print(f"⚠️ Could not process {filename} - skipping")
-            except Exception as e:
-                print(f"💥 Error processing {filename}: {e}")
-                import traceback
-                traceback.print_exc()
-                
+        process_images_once(image_folder, index=index)
+
         print(f"⏰ Processed {len(image_files)} images. Waiting 5 seconds...")
         time.sleep(5)
     
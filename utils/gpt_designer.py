@@ -56,6 +56,47 @@ def load_fabric_inventory(path="fabric_inventory_normalized.json"):
     with open(path, "r") as f:
         return json.load(f)
     
+# Group fabrics by base name (e.g. yellow_kurti_back + yellow_kurti_full -> yellow_kurti)
+def get_base_name(name):
+    suffixes = ["_detail", "_back", "_dupatta", "_bottoms", "_front", "_full"]
+    for suffix in suffixes:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def group_fabrics(inventory):
+    grouped = {}
+    for entry in inventory:
+        grouped.setdefault(get_base_name(entry["name"]), []).append(entry)
+    return grouped
+
+def _encode_image(path):
+    with open(path, "rb") as f:
+        return {"name": os.path.basename(path), "base64": base64.b64encode(f.read()).decode("utf-8")}
+
+def load_fabric_images(base_name, folder="sample_inputs/clean_jpegs", entries=(), processed_folder="sample_inputs/processed_images"):
+    """
+    Load the photos for a fabric group from the cleaned folder. Fabrics ingested since
+    then only exist in processed_images, so fall back to each entry's image_main, or the
+    same filename in processed_folder (older entries still say images/<file>).
+    """
+    fabric_images = []
+    if os.path.exists(folder):
+        for filename in sorted(os.listdir(folder)):
+            if filename.lower().endswith((".jpg", ".jpeg")) and base_name in filename:
+                fabric_images.append(_encode_image(os.path.join(folder, filename)))
+
+    if not fabric_images:
+        for entry in entries:
+            path = entry.get("image_main")
+            if not path:
+                continue
+            candidates = [path, os.path.join(processed_folder, os.path.basename(path))]
+            found = next((p for p in candidates if os.path.exists(p)), None)
+            if found:
+                fabric_images.append(_encode_image(found))
+    return fabric_images
+
 def select_fabric_images(inventory, folder="sample_inputs/clean_jpegs"):
     print("🧵 Available fabrics:")
     for item in inventory:
@@ -158,11 +199,23 @@ if __name__ == "__main__":
     selected_name, fabric_images, matching_inventory = select_fabric_images(fabric_inventory)
 
     if selected_name and fabric_images:
-        suggestions = suggest_designs(selected_name, inspiration_images, fabric_images, matching_inventory)
+        # Run as `python utils/gpt_designer.py` the repo root isn't on sys.path
+        if not __package__:
+            import sys
+            sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from utils import design_history, session_store
+        inspo_fingerprint = design_history.inspiration_fingerprint(inspiration_images)
+        reusable = design_history.find_reusable(selected_name, inspo_fingerprint, require_images=False)
+
+        if reusable:
+            print(f"♻️ Reusing saved design set #{reusable['id']} from design history")
+            suggestions = reusable["suggestions"]
+        else:
+            suggestions = suggest_designs(selected_name, inspiration_images, fabric_images, matching_inventory)
+            design_history.record_suggestions(selected_name, inspo_fingerprint, suggestions, matching_inventory)
         print("\n Suggested Clothing Designs:\n")
         print(suggestions)
 
          # Save for DALL·E generation
-        with open("last_suggestions.txt", "w") as f:
-            f.write(suggestions)
+        session_store.atomic_write("last_suggestions.txt", suggestions)
         print("💾 Saved GPT suggestions to last_suggestions.txt")
\ No newline at end of file
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Every designer session gets its own folder under here for uploads and outputs
+SESSIONS_ROOT = "sessions"
+
+# Sessions untouched for this long are removed by cleanup_expired()
+SESSION_TTL_SECONDS = 24 * 60 * 60
+
+SESSION_SUBFOLDERS = ("images", "inspiration")
+
+# File whose mtime records the last time a session was used
+_LAST_SEEN = ".last_seen"
+
+# Read once at import: os.umask can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def atomic_write(path, data):
+    """
+    Write bytes or text to path via a temp file in the same folder + rename,
+    so readers only ever see the old file or the complete new one.
+    Keeps the existing file's permissions (new files get the usual 0o666 & ~umask),
+    since mkstemp would otherwise leave them owner-only.
+    """
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    mode = "wb" if isinstance(data, (bytes, bytearray, memoryview)) else "w"
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            file_mode = os.stat(path).st_mode & 0o7777
+        except FileNotFoundError:
+            file_mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, file_mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def atomic_write_json(path, obj):
+    atomic_write(path, json.dumps(obj, indent=2))
+
+@contextmanager
+def file_lock(path):
+    """
+    Exclusive inter-process lock for a shared file, held on a sidecar `<path>.lock`.
+    Use it around read-modify-write of shared state like the fabric inventory.
+    """
+    lock_path = f"{path}.lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a+") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+def read_json(path, default=None):
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, "r") as f:
+            return json.load(f)
+    return default
+
+@contextmanager
+def locked_json(path, default=None):
+    """
+    Locked read-modify-write of a JSON file:
+
+        with locked_json("fabric_inventory.json", []) as inventory:
+            inventory.append(entry)
+
+    The updated object is written back atomically when the block exits without error.
+    """
+    with file_lock(path):
+        data = read_json(path, default)
+        yield data
+        atomic_write_json(path, data)
+
+def session_dir(session_id, root=SESSIONS_ROOT):
+    return os.path.join(root, session_id)
+
+def session_path(session_id, *parts, root=SESSIONS_ROOT):
+    return os.path.join(session_dir(session_id, root), *parts)
+
+def touch_session(session_id, root=SESSIONS_ROOT):
+    marker = session_path(session_id, _LAST_SEEN, root=root)
+    os.makedirs(os.path.dirname(marker), exist_ok=True)
+    with open(marker, "a"):
+        os.utime(marker, None)
+
+def create_session(root=SESSIONS_ROOT):
+    """Create a fresh workspace and return its id."""
+    session_id = uuid.uuid4().hex[:12]
+    for sub in SESSION_SUBFOLDERS:
+        os.makedirs(session_path(session_id, sub, root=root), exist_ok=True)
+    touch_session(session_id, root)
+    print(f"🪪 Created session {session_id}")
+    return session_id
+
+def cleanup_expired(ttl=SESSION_TTL_SECONDS, root=SESSIONS_ROOT):
+    """Delete session folders not touched within ttl seconds. Returns the removed ids."""
+    removed = []
+    if not os.path.exists(root):
+        return removed
+
+    now = time.time()
+    for session_id in os.listdir(root):
+        folder = session_dir(session_id, root)
+        if not os.path.isdir(folder):
+            continue
+        marker = os.path.join(folder, _LAST_SEEN)
+        last_seen = os.path.getmtime(marker if os.path.exists(marker) else folder)
+        if now - last_seen > ttl:
+            shutil.rmtree(folder, ignore_errors=True)
+            removed.append(session_id)
+
+    if removed:
+        print(f"🧹 Removed {len(removed)} expired session(s)")
+    return removed
+
+if __name__ == "__main__":
+    # python -m utils.session_store [ttl_hours]
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else SESSION_TTL_SECONDS / 3600
+    removed = cleanup_expired(ttl=hours * 3600)
+    print(f"✅ Session cleanup done ({len(removed)} older than {hours:g}h)")